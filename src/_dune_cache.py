@@ -0,0 +1,72 @@
+"""
+On-disk cache for Dune Analytics query results.
+
+A Dune query execution is network-bound and dominates analyzer run time
+(tens of seconds to minutes) while its results change slowly, so results
+are cached as parquet files keyed by a hash of the query identity. Warm
+runs read the parquet in milliseconds and consume no Dune API quota.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+CACHE_DIR = os.path.join(".cache", "dune")
+
+
+def _cache_key(parts):
+    """Hash the identifying parts of a query into a hex cache key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cached_query(key_parts, ttl, fetch_fn):
+    """
+    Return a DataFrame for the query described by key_parts, serving it
+    from the on-disk cache when a fresh enough copy exists.
+
+    Args:
+        key_parts: Sequence identifying the query (query id, parameters,
+            raw SQL, ...)
+        ttl: Maximum cache age in seconds
+        fetch_fn: Zero-argument callable that executes the query and
+            returns a DataFrame, or None on failure (never cached)
+
+    Returns:
+        DataFrame with the query results, or None if fetch_fn failed
+    """
+    key = _cache_key(key_parts)
+    data_path = os.path.join(CACHE_DIR, f"{key}.parquet")
+    meta_path = os.path.join(CACHE_DIR, f"{key}.json")
+
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path) as f:
+                fetched_at = json.load(f).get("fetched_at", 0)
+            if time.time() - fetched_at < ttl:
+                return pd.read_parquet(data_path)
+        except Exception as e:
+            print(f"Ignoring unreadable Dune cache entry {key}: {e}")
+
+    df = fetch_fn()
+    if df is None:
+        return None
+
+    # Write atomically so a concurrent reader never sees a partial file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        df.to_parquet(data_path + ".tmp")
+        os.replace(data_path + ".tmp", data_path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"fetched_at": time.time()}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+    except Exception as e:
+        print(f"Failed to write Dune cache entry {key}: {e}")
+
+    return df
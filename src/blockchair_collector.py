@@ -40,11 +40,11 @@ class BlockchairCollector:
         self.api_key = api_key
         self.data_dir = data_dir
         self.ensure_data_dir()
-        
+        self._data_dir_abs = os.path.abspath(self.data_dir)
+
     def ensure_data_dir(self):
         """Ensure the data directory exists."""
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
     
     def get_eth_contract_transactions(self, contract_address, start_date=None, end_date=None, limit=100):
         """
@@ -348,10 +348,12 @@ class BlockchairCollector:
         }
     
     def _save_data(self, data, filename):
-        """Save data to JSON file."""
-        filepath = os.path.join(self.data_dir, filename)
-        with open(filepath, 'w') as f:
+        """Save data to JSON file atomically (write temp, then rename)."""
+        filepath = os.path.join(self._data_dir_abs, filename)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, 'w') as f:
             json.dump(data, f, indent=2)
+        os.replace(tmp_path, filepath)
         print(f"Data saved to {filepath}")
     
     def collect_all_protocols_data(self, start_date=None, end_date=None):
@@ -9,17 +9,64 @@ This module handles the collection of revenue data from various sources:
 
 import os
 import json
+import random
 import time
+import types
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 from config import PROTOCOLS, NETWORKS, DEFILLAMA_BASE_URL, DEFILLAMA_PROTOCOL_URL, COINGECKO_BASE_URL, COINGECKO_COINS_URL
 
+# Fields of an Etherscan transaction record actually consumed downstream;
+# everything arrives as strings and is cast after Arrow materialization.
+_ETHERSCAN_TX_FIELDS = ("timeStamp", "value", "from", "to", "hash")
+
+# Static per-protocol record skeletons, built once from config at import
+# time and frozen; collect_all_data only attaches the dynamic fields.
+_PROTOCOL_SKELETONS = types.MappingProxyType({
+    protocol['name']: types.MappingProxyType({
+        'name': protocol['name'],
+        'slug': protocol['slug'],
+        'token_type': protocol['token_type'],
+        'chains': protocol['chains']
+    })
+    for protocol in PROTOCOLS
+})
+
+
 class DataCollector:
     def __init__(self, data_dir="../data"):
         """Initialize the DataCollector."""
         self.data_dir = data_dir
         self.ensure_data_dir()
+
+        # Shared session with automatic retries for rate limits (429) and
+        # transient server errors, honoring Retry-After when the API sends it.
+        self.session = requests.Session()
+        retry = Retry(
+            total=5,
+            backoff_factor=1.0,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+            allowed_methods=["GET"]
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         
     def ensure_data_dir(self):
         """Ensure the data directory exists."""
@@ -27,46 +74,75 @@ class DataCollector:
             os.makedirs(self.data_dir)
             
     def fetch_market_cap_data(self):
-        """Fetch market cap data from CoinGecko API."""
+        """
+        Fetch market cap data from CoinGecko API.
+
+        Uses the batched /coins/markets endpoint, which returns market cap,
+        price and supplies for up to 250 coins in a single request, instead
+        of one /coins/{id} round-trip (plus rate-limit sleep) per protocol.
+        """
         print("Fetching market cap data from CoinGecko...")
         market_cap_data = {}
-        
-        for protocol in PROTOCOLS:
-            try:
-                url = f"{COINGECKO_COINS_URL}/{protocol['slug']}"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    data = response.json()
-                    market_cap_data[protocol['name']] = {
-                        'market_cap': data.get('market_data', {}).get('market_cap', {}).get('usd', None),
-                        'current_price': data.get('market_data', {}).get('current_price', {}).get('usd', None),
-                        'total_supply': data.get('market_data', {}).get('total_supply', None),
-                        'max_supply': data.get('market_data', {}).get('max_supply', None)
+
+        slug_to_name = {protocol['slug']: protocol['name'] for protocol in PROTOCOLS}
+
+        try:
+            url = f"{COINGECKO_BASE_URL}/coins/markets"
+            params = {
+                'vs_currency': 'usd',
+                'ids': ','.join(slug_to_name),
+                'per_page': 250
+            }
+            response = self.session.get(url, params=params)
+            if response.status_code == 200:
+                for coin in response.json():
+                    name = slug_to_name.get(coin.get('id'))
+                    if name is None:
+                        continue
+                    market_cap_data[name] = {
+                        'market_cap': coin.get('market_cap', None),
+                        'current_price': coin.get('current_price', None),
+                        'total_supply': coin.get('total_supply', None),
+                        'max_supply': coin.get('max_supply', None)
                     }
-                    print(f"Successfully fetched market cap data for {protocol['name']}")
-                else:
-                    print(f"Failed to fetch market cap data for {protocol['name']}: {response.status_code}")
-                # Respect API rate limits
-                time.sleep(1)
-            except Exception as e:
-                print(f"Error fetching market cap data for {protocol['name']}: {e}")
-                
+                    print(f"Successfully fetched market cap data for {name}")
+            else:
+                print(f"Failed to fetch market cap data: {response.status_code}")
+        except Exception as e:
+            print(f"Error fetching market cap data: {e}")
+
         # Save market cap data
         self._save_data(market_cap_data, "market_cap_data.json")
         return market_cap_data
     
     def fetch_defillama_protocol_data(self):
-        """Fetch protocol data from DeFi Llama API for cross-verification."""
+        """
+        Fetch protocol data from DeFi Llama API for cross-verification.
+
+        Only the fields consumed downstream are kept per protocol:
+            tvl:        current TVL broken down by chain (currentChainTvls)
+            category:   DeFi Llama protocol category
+            mcap:       market cap reported by DeFi Llama
+            latest_tvl: last 30 points of the historical TVL series
+
+        The full response (multi-MB of historical series per protocol) is
+        deliberately not stored, so callers must not rely on other fields.
+        """
         print("Fetching protocol data from DeFi Llama...")
         protocol_data = {}
-        
+
         for protocol in PROTOCOLS:
             try:
                 url = f"{DEFILLAMA_PROTOCOL_URL}/{protocol['defillama_id']}"
-                response = requests.get(url)
+                response = self.session.get(url)
                 if response.status_code == 200:
                     data = response.json()
-                    protocol_data[protocol['name']] = data
+                    protocol_data[protocol['name']] = {
+                        'tvl': data.get('currentChainTvls'),
+                        'category': data.get('category'),
+                        'mcap': data.get('mcap'),
+                        'latest_tvl': data['tvl'][-30:] if data.get('tvl') else []
+                    }
                     print(f"Successfully fetched DeFi Llama data for {protocol['name']}")
                 else:
                     print(f"Failed to fetch DeFi Llama data for {protocol['name']}: {response.status_code}")
@@ -93,11 +169,11 @@ class DataCollector:
             DataFrame with transaction data
         """
         print(f"Fetching Etherscan data for contract {contract_address}...")
-        
+
         # Convert dates to timestamps
-        start_timestamp = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
-        end_timestamp = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
-        
+        start_timestamp = int(pd.Timestamp(start_date).timestamp())
+        end_timestamp = int(pd.Timestamp(end_date).timestamp())
+
         # Base URL for Etherscan API
         base_url = "https://api.etherscan.io/api"
         
@@ -116,23 +192,38 @@ class DataCollector:
             params["apikey"] = api_key
             
         try:
-            response = requests.get(base_url, params=params)
+            # Etherscan reports rate limits in the JSON body with status "0",
+            # which the transport-level Retry cannot see; retry those here
+            # with exponential backoff and jitter, honoring Retry-After.
+            for attempt in range(5):
+                response = self.session.get(base_url, params=params)
+                if response.status_code == 200:
+                    data = response.json()
+                    message = str(data.get("message", ""))
+                    if data.get("status") != "1" and "rate limit" in message.lower():
+                        delay = float(response.headers.get(
+                            "Retry-After", 2 ** attempt + random.uniform(0, 1)
+                        ))
+                        print(f"Etherscan rate limit hit, retrying in {delay:.1f}s...")
+                        time.sleep(delay)
+                        continue
+                break
             if response.status_code == 200:
                 data = response.json()
                 if data["status"] == "1":
-                    # Convert to DataFrame
-                    transactions = pd.DataFrame(data["result"])
-                    
-                    # Filter by timestamp
-                    transactions["timeStamp"] = transactions["timeStamp"].astype(int)
-                    transactions = transactions[
-                        (transactions["timeStamp"] >= start_timestamp) & 
-                        (transactions["timeStamp"] <= end_timestamp)
-                    ]
-                    
-                    # Convert values from Wei to Ether
-                    transactions["value_eth"] = transactions["value"].astype(float) / 10**18
-                    
+                    transactions = self._build_transactions_frame(data["result"])
+
+                    # Filter by timestamp (vectorized, no object-dtype round-trip)
+                    mask = transactions["timeStamp"].between(start_timestamp, end_timestamp)
+                    transactions = transactions[mask]
+
+                    # Convert values from Wei to Ether; the raw wei column is
+                    # no longer needed once scaled
+                    transactions["value_eth"] = pd.to_numeric(
+                        transactions["value"] / 10**18, downcast="float"
+                    )
+                    transactions = transactions.drop(columns="value")
+
                     return transactions
                 else:
                     print(f"Etherscan API error: {data.get('message', 'Unknown error')}")
@@ -142,7 +233,46 @@ class DataCollector:
             print(f"Error fetching Etherscan data: {e}")
             
         return pd.DataFrame()  # Return empty DataFrame on error
-    
+
+    def _build_transactions_frame(self, result):
+        """
+        Build a transactions DataFrame from an Etherscan result list.
+
+        When pyarrow is installed, the records are materialized against an
+        explicit Arrow schema and handed to pandas zero-copy, skipping
+        pandas' row-by-row type inference over all ~15 string fields per
+        transaction. Falls back to plain DataFrame construction otherwise.
+        """
+        if pa is not None and result:
+            schema = pa.schema([(name, pa.string()) for name in _ETHERSCAN_TX_FIELDS])
+            table = pa.Table.from_pylist(result, schema=schema)
+            table = table.set_column(
+                table.schema.get_field_index("timeStamp"), "timeStamp",
+                pc.cast(table.column("timeStamp"), pa.int64())
+            )
+            table = table.set_column(
+                table.schema.get_field_index("value"), "value",
+                pc.cast(table.column("value"), pa.float64())
+            )
+            # Dictionary-encode the address columns (few unique senders/
+            # receivers per contract) so they land as pandas Categoricals
+            for col in ("from", "to"):
+                table = table.set_column(
+                    table.schema.get_field_index(col), col,
+                    pc.dictionary_encode(table.column(col))
+                )
+            return table.to_pandas(self_destruct=True)
+
+        # Project to the consumed columns before any casting: Etherscan
+        # returns ~15 string fields per tx and the rest would sit in memory
+        # as Python objects for no benefit
+        transactions = pd.DataFrame(result)[list(_ETHERSCAN_TX_FIELDS)]
+        transactions["timeStamp"] = pd.to_numeric(transactions["timeStamp"], downcast="unsigned")
+        transactions["value"] = transactions["value"].astype("float64")
+        for col in ("from", "to"):
+            transactions[col] = transactions[col].astype("category")
+        return transactions
+
     def fetch_solscan_revenue_data(self, account_address, start_date, end_date):
         """
         Fetch revenue data from Solscan for Solana-based protocols.
@@ -171,7 +301,7 @@ class DataCollector:
         }
         
         try:
-            response = requests.get(base_url, params=params)
+            response = self.session.get(base_url, params=params)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -180,6 +310,9 @@ class DataCollector:
                 
                 # Filter by timestamp if available
                 if "blockTime" in transactions.columns:
+                    transactions["blockTime"] = pd.to_numeric(
+                        transactions["blockTime"], downcast="unsigned"
+                    )
                     transactions = transactions[
                         (transactions["blockTime"] >= start_timestamp) & 
                         (transactions["blockTime"] <= end_timestamp)
@@ -337,18 +470,72 @@ class DataCollector:
             "sustainability_score": sustainability_score,
             "is_sustainable": is_sustainable
         }
-    
-    def _save_data(self, data, filename):
-        """Save data to JSON file."""
+
+    def analyze_revenue_sustainability_vectorized(self, names, revenues, incentives):
+        """
+        Vectorized counterpart of analyze_revenue_sustainability.
+
+        Scores many protocols in one NumPy pass instead of a Python call
+        (and if/elif ladder) per protocol. Incentives must be known for
+        every row; use the scalar method when incentives are unavailable.
+
+        Args:
+            names: Sequence of protocol names
+            revenues: Array-like of revenue amounts
+            incentives: Array-like of incentives amounts
+
+        Returns:
+            DataFrame with one row per protocol and the same fields as the
+            scalar method
+        """
+        revenues = np.asarray(revenues, dtype='float64')
+        incentives = np.asarray(incentives, dtype='float64')
+
+        ratio = np.where(incentives > 0, revenues / np.where(incentives > 0, incentives, 1), np.inf)
+
+        # Same thresholds as the scalar if/elif ladder
+        score = np.choose(np.digitize(ratio, [0.5, 1.0, 2.0]), [25, 50, 75, 100])
+        score = np.where(ratio > 0, score, 0)
+
+        return pd.DataFrame({
+            "protocol": list(names),
+            "revenue": revenues,
+            "incentives": incentives,
+            "sustainability_ratio": ratio,
+            "sustainability_score": score,
+            "is_sustainable": ratio >= 1
+        })
+
+    def _save_data(self, data, filename, compact=False):
+        """
+        Save data to JSON file.
+
+        Uses orjson when available (much faster than stdlib json for the
+        multi-MB DeFi Llama dumps). Pass compact=True to skip indentation
+        and shrink the file size. Writes a temp file and renames it so
+        readers never see a partially written dump.
+        """
         filepath = os.path.join(self.data_dir, filename)
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        tmp_path = filepath + ".tmp"
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY
+            if not compact:
+                option |= orjson.OPT_INDENT_2
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=option))
+        else:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=None if compact else 2)
+        os.replace(tmp_path, filepath)
         print(f"Data saved to {filepath}")
-        
+
     def load_data(self, filename):
         """Load data from JSON file."""
         filepath = os.path.join(self.data_dir, filename)
         if os.path.exists(filepath):
+            if orjson is not None:
+                with open(filepath, 'rb') as f:
+                    return orjson.loads(f.read())
             with open(filepath, 'r') as f:
                 return json.load(f)
         return None
@@ -364,26 +551,18 @@ class DataCollector:
         # Initialize results dictionary
         results = {}
         
-        # Process each protocol
-        for protocol in PROTOCOLS:
-            protocol_name = protocol['name']
+        # Process each protocol: static fields come from the frozen
+        # skeletons, only the dynamic parts are built per run
+        for protocol_name, skeleton in _PROTOCOL_SKELETONS.items():
             print(f"Processing {protocol_name}...")
-            
-            # Initialize protocol data
-            protocol_data = {
-                "name": protocol_name,
-                "slug": protocol['slug'],
-                "token_type": protocol['token_type'],
-                "chains": protocol['chains'],
+            results[protocol_name] = {
+                **skeleton,
                 "market_cap": market_cap_data.get(protocol_name, {}).get('market_cap', None),
                 "revenue": {},
                 "qoq_growth": {},
                 "sustainability": {}
             }
-            
-            # Add to results
-            results[protocol_name] = protocol_data
-            
+
         # Save collected data
         self._save_data(results, "protocol_analysis_data.json")
         print("Data collection complete!")
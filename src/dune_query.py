@@ -7,11 +7,45 @@ import os
 from dotenv import load_dotenv
 from dune_client.client import DuneClient
 from dune_client.query import QueryBase
+import numpy as np
 import pandas as pd
 
 # Load environment variables
 load_dotenv()
 
+
+def _month_label(month_id):
+    """Format a month id (months since 1970-01) as YYYY-MM."""
+    return str(np.datetime64(int(month_id), 'M'))
+
+
+def _quarter_label(quarter_id):
+    """Format a quarter id (quarters since 1970Q1) as YYYYQN."""
+    year, quarter = divmod(int(quarter_id), 4)
+    return f"{1970 + year}Q{quarter + 1}"
+
+
+def _year_label(year_id):
+    """Format a year id (years since 1970) as YYYY."""
+    return str(1970 + int(year_id))
+
+
+def _aggregate_buckets(bucket_id, received, cumul):
+    """
+    Aggregate sorted per-day arrays into contiguous buckets.
+
+    Relies on bucket_id being sorted, which holds once the frame is sorted
+    by day: each bucket is then a contiguous run, its sum comes from
+    np.add.reduceat and its last cumulative value from the run's final row.
+
+    Returns:
+        Tuple of (unique bucket ids, per-bucket sums, last cumulative
+        value per bucket) as NumPy arrays.
+    """
+    starts = np.r_[0, np.flatnonzero(np.diff(bucket_id)) + 1]
+    ends = np.r_[starts[1:] - 1, len(bucket_id) - 1]
+    return bucket_id[starts], np.add.reduceat(received, starts), cumul[ends]
+
 class DuneQueryManager:
     def __init__(self):
         self.api_key = os.getenv("DUNE_API_KEY")
@@ -117,54 +151,39 @@ class DuneQueryManager:
             
             # Ensure day column is datetime
             df['day'] = pd.to_datetime(df['day'])
-            
+
             # Sort by date
             df = df.sort_values('day')
-            
-            # Create time period columns
-            df['month'] = df['day'].dt.to_period('M')
-            df['quarter'] = df['day'].dt.to_period('Q')
-            df['year'] = df['day'].dt.to_period('Y')
-            
+
             # Check if we need to rename columns
             eth_received_col = 'eth_received' if 'eth_received' in df.columns else 'ETH received'
             eth_cumul_col = 'eth_received_cumul' if 'eth_received_cumul' in df.columns else 'ETH received cumul'
-            
-            # Monthly aggregation
-            monthly_data = df.groupby('month').agg({
-                eth_received_col: 'sum',
-                eth_cumul_col: 'last'
-            }).reset_index()
-            monthly_data['month'] = monthly_data['month'].astype(str)
-            
-            # Quarterly aggregation
-            quarterly_data = df.groupby('quarter').agg({
-                eth_received_col: 'sum',
-                eth_cumul_col: 'last'
-            }).reset_index()
-            quarterly_data['quarter'] = quarterly_data['quarter'].astype(str)
-            
-            # Yearly aggregation
-            yearly_data = df.groupby('year').agg({
-                eth_received_col: 'sum',
-                eth_cumul_col: 'last'
-            }).reset_index()
-            yearly_data['year'] = yearly_data['year'].astype(str)
-            
-            # Rename columns in aggregated data for consistency
-            monthly_data = monthly_data.rename(columns={
-                eth_received_col: 'eth_received',
-                eth_cumul_col: 'eth_received_cumul'
-            })
-            quarterly_data = quarterly_data.rename(columns={
-                eth_received_col: 'eth_received',
-                eth_cumul_col: 'eth_received_cumul'
-            })
-            yearly_data = yearly_data.rename(columns={
-                eth_received_col: 'eth_received',
-                eth_cumul_col: 'eth_received_cumul'
-            })
-            
+
+            # Integer bucket ids derived straight from the datetime64 values
+            # (months counted from 1970-01). This stays on the NumPy fast path
+            # instead of allocating three object-dtype Period columns, one
+            # object per row; bucket ids become readable period strings only
+            # at output time.
+            month_id = df['day'].to_numpy().astype('datetime64[M]').view('i8')
+
+            received = df[eth_received_col].to_numpy(dtype='float64')
+            cumul = df[eth_cumul_col].to_numpy(dtype='float64')
+
+            # The data is sorted and the cumulative column is monotonic, so
+            # each bucket's "last" value is simply the value at the bucket's
+            # final row — one reduceat pass per period, no groupby sorting.
+            def build_table(bucket_id, label_name, label_func):
+                ids, sums, lasts = _aggregate_buckets(bucket_id, received, cumul)
+                return pd.DataFrame({
+                    label_name: [label_func(i) for i in ids],
+                    'eth_received': sums,
+                    'eth_received_cumul': lasts
+                })
+
+            monthly_data = build_table(month_id, 'month', _month_label)
+            quarterly_data = build_table(month_id // 3, 'quarter', _quarter_label)
+            yearly_data = build_table(month_id // 12, 'year', _year_label)
+
             return {
                 'daily': df,
                 'monthly': monthly_data,
@@ -2,7 +2,9 @@
 Enhanced Aave Analyzer with CoinMarketCap token statistics integration.
 This script combines the functionality of aave_analyzer.py with token market data.
 """
+import logging
 import os
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime, timedelta
@@ -11,11 +13,24 @@ from dotenv import load_dotenv
 from dune_client.types import QueryParameter
 from dune_client.client import DuneClient
 from dune_client.query import QueryBase
+import _dune_cache
 import token_stats
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class EnhancedAaveAnalyzer:
     """
     Enhanced analyzer for Aave protocol revenue data with token market statistics.
@@ -25,6 +40,16 @@ class EnhancedAaveAnalyzer:
     
     # Common Aave tokens
     AAVE_TOKENS = ["AAVE", "USDC", "USDT", "DAI", "WETH", "WBTC", "LINK", "WMATIC", "WAVAX"]
+
+    # Human-readable time intervals mapped to the Dune parameter enum
+    _INTERVAL_MAP = {
+        "30 days": "30d",
+        "90 days": "90d",
+        "180 days": "180d",
+        "6 months": "180d",
+        "1 year": "1y",
+        "365 days": "1y"
+    }
     
     def __init__(self):
         """
@@ -50,43 +75,53 @@ class EnhancedAaveAnalyzer:
         try:
             print(f"Executing Dune query {self.AAVE_QUERY_ID} with parameters...")
             
-            # Create query object with parameters
-            # Use "90d" instead of "90 days" for the Time interval parameter
-            # Common enum values are likely "30d", "90d", "180d", "1y", etc.
-            time_interval_value = "90d"  # Default to 90 days
-            
-            if time_interval == "30 days":
-                time_interval_value = "30d"
-            elif time_interval == "180 days" or time_interval == "6 months":
-                time_interval_value = "180d"
-            elif time_interval == "1 year" or time_interval == "365 days":
-                time_interval_value = "1y"
-            
+            # Map to the enum the query expects ("30d", "90d", "180d",
+            # "1y", ...), defaulting to 90 days
+            time_interval_value = self._INTERVAL_MAP.get(time_interval, "90d")
+
             print(f"Using time interval value: {time_interval_value}")
-            
-            query = QueryBase(
-                query_id=self.AAVE_QUERY_ID,
-                params=[
-                    QueryParameter.text_type(name="Time interval", value=time_interval_value),
-                    QueryParameter.number_type(name="Trading Num Days", value=trading_days)
-                ]
+
+            def fetch():
+                query = QueryBase(
+                    query_id=self.AAVE_QUERY_ID,
+                    params=[
+                        QueryParameter.text_type(name="Time interval", value=time_interval_value),
+                        QueryParameter.number_type(name="Trading Num Days", value=trading_days)
+                    ]
+                )
+
+                # Execute query and get results
+                results = self.dune.run_query(query)
+
+                if not results or not hasattr(results, 'result') or not results.result:
+                    print("No results returned from Dune query")
+                    return None
+
+                # Convert to DataFrame; the Arrow path builds the columns
+                # against the schema fixed by the SQL and hands them to
+                # pandas zero-copy, skipping per-row dtype inference
+                rows = results.result.rows
+                if pyarrow is not None and rows:
+                    schema = pyarrow.schema([
+                        ('day', pyarrow.string()),
+                        ('token', pyarrow.string()),
+                        ('Deposits_volume', pyarrow.float64()),
+                        ('Borrow_volume', pyarrow.float64())
+                    ])
+                    table = pyarrow.Table.from_pylist(rows, schema=schema)
+                    return table.to_pandas(self_destruct=True)
+                return pd.DataFrame(rows)
+
+            # Daily series: a 24h cache TTL avoids re-running the query
+            # (and burning Dune quota) for identical parameters
+            return _dune_cache.cached_query(
+                (self.AAVE_QUERY_ID, time_interval_value, trading_days),
+                ttl=86400,
+                fetch_fn=fetch
             )
-            
-            # Execute query and get results
-            results = self.dune.run_query(query)
-            
-            if not results or not hasattr(results, 'result') or not results.result:
-                print("No results returned from Dune query")
-                return None
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(results.result.rows)
-            return df
-            
-        except Exception as e:
-            print(f"Error fetching revenue data: {e}")
-            import traceback
-            traceback.print_exc()
+
+        except Exception:
+            logger.exception("Error fetching revenue data")
             return None
     
     def process_revenue_data(self, df: pd.DataFrame) -> Dict:
@@ -112,42 +147,57 @@ class EnhancedAaveAnalyzer:
             print("\nData types:")
             print(df.dtypes)
             
-            # Rename day column to date for consistency
-            df = df.rename(columns={'day': 'date'})
-            
-            # Ensure date column is datetime
-            df['date'] = pd.to_datetime(df['date'])
-            
+            # Move day into a datetime date column in one step; cache=True
+            # deduplicates the date strings repeated across tokens
+            df['date'] = pd.to_datetime(df.pop('day'), cache=True)
+
             # Convert volume columns to numeric, handling any non-numeric values
-            df['Deposits_volume'] = pd.to_numeric(df['Deposits_volume'], errors='coerce').fillna(0)
-            df['Borrow_volume'] = pd.to_numeric(df['Borrow_volume'], errors='coerce').fillna(0)
+            df['Deposits_volume'] = pd.to_numeric(df['Deposits_volume'], errors='coerce').fillna(0.0)
+            df['Borrow_volume'] = pd.to_numeric(df['Borrow_volume'], errors='coerce').fillna(0.0)
             
             # Sort by date
             df = df.sort_values('date')
-            
-            # Create monthly aggregations
-            monthly_data = df.groupby([df['date'].dt.to_period('M'), 'token']).agg({
+
+            # Categorical token column: groupby runs on integer codes
+            # instead of hashing the repeated token strings
+            df['token'] = df['token'].astype('category')
+
+            # Create monthly aggregations; sort=False/observed=True skip the
+            # internal group sort (the frame is already date-ordered)
+            monthly_data = df.groupby([df['date'].dt.to_period('M'), 'token'],
+                                      sort=False, observed=True).agg({
                 'Deposits_volume': 'sum',
                 'Borrow_volume': 'sum'
             }).reset_index()
-            
+
             # Calculate monthly revenue (based on borrow volume)
             monthly_data['revenue'] = monthly_data['Borrow_volume'] * (self.AVERAGE_BORROW_APR / 12)
+
+            # Calculate cumulative metrics in one grouped pass over both columns
+            monthly_data[['cumulative_volume', 'cumulative_revenue']] = (
+                monthly_data.groupby('token', sort=False)[['Borrow_volume', 'revenue']].cumsum()
+            )
             
-            # Calculate cumulative metrics
-            monthly_data['cumulative_volume'] = monthly_data.groupby('token')['Borrow_volume'].cumsum()
-            monthly_data['cumulative_revenue'] = monthly_data.groupby('token')['revenue'].cumsum()
-            
-            # Convert period to string for better serialization
+            # Calculate totals across all tokens while date is still a
+            # Period column, so the groupby runs on integer period codes
+            # instead of comparing strings (numpy scalars serialize fine
+            # through orjson's OPT_SERIALIZE_NUMPY)
+            total_volume = monthly_data['Borrow_volume'].sum()
+            total_revenue = monthly_data['revenue'].sum()
+            avg_monthly_revenue = monthly_data.groupby('date', observed=True, sort=False)['revenue'].sum().mean()
+
+            # Keep a datetime column alongside the string form so downstream
+            # consumers don't have to reparse the serialized dates
+            monthly_data['_date_dt'] = monthly_data['date'].dt.to_timestamp()
+
+            # Convert period to string only at the serialization boundary
             monthly_data['date'] = monthly_data['date'].astype(str)
             
-            # Calculate totals across all tokens
-            total_volume = float(monthly_data['Borrow_volume'].sum())
-            total_revenue = float(monthly_data['revenue'].sum())
-            avg_monthly_revenue = float(monthly_data.groupby('date')['revenue'].sum().mean())
-            
+            # monthly_metrics stays a DataFrame: converting to records here
+            # would allocate a dict per row only for consumers to rebuild
+            # the frame; serialize with to_dict('records') at JSON time
             return {
-                'monthly_metrics': monthly_data.to_dict('records'),
+                'monthly_metrics': monthly_data,
                 'total_volume': total_volume,
                 'total_revenue': total_revenue,
                 'avg_monthly_revenue': avg_monthly_revenue,
@@ -159,10 +209,8 @@ class EnhancedAaveAnalyzer:
                 }
             }
             
-        except Exception as e:
-            print(f"Error processing revenue data: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error processing revenue data")
             return None
     
     def print_summary(self, results: Dict):
@@ -220,10 +268,18 @@ class EnhancedAaveAnalyzer:
             # Print revenue summary
             self.print_summary(results)
             
-            # Save monthly data to CSV
+            # Save monthly data to CSV (without the internal datetime column)
             if 'monthly_metrics' in results:
-                pd.DataFrame(results['monthly_metrics']).to_csv('aave_monthly_revenue.csv', index=False)
+                monthly_out = results['monthly_metrics'].drop(columns='_date_dt')
+                monthly_out.to_csv('aave_monthly_revenue.csv', index=False)
                 print("Detailed monthly data saved to 'aave_monthly_revenue.csv'")
+
+                # Also emit a columnar copy for downstream tools: parquet
+                # keeps dtypes and reads ~10x faster than the CSV
+                if pyarrow is not None:
+                    monthly_out.to_parquet('aave_monthly_revenue.parquet',
+                                           compression='zstd', index=False)
+                    print("Detailed monthly data saved to 'aave_monthly_revenue.parquet'")
             
             # Fetch token market data
             print("\nFetching token market data from CoinMarketCap...")
@@ -266,53 +322,76 @@ class EnhancedAaveAnalyzer:
                 'protocol': 'Aave'
             }
             
-            # Save to file
-            with open('aave_combined_analysis.json', 'w') as f:
-                json.dump(combined_report, f, indent=2)
+            # Save to file; orjson is much faster on the record-heavy
+            # report and serializes numpy scalars natively. Write temp,
+            # then rename, so readers never see a partial report.
+            if orjson is not None:
+                with open('aave_combined_analysis.json.tmp', 'wb') as f:
+                    f.write(orjson.dumps(
+                        combined_report,
+                        option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+                    ))
+            else:
+                with open('aave_combined_analysis.json.tmp', 'w') as f:
+                    json.dump(combined_report, f, indent=2, default=float)
+            os.replace('aave_combined_analysis.json.tmp', 'aave_combined_analysis.json')
             print("Combined analysis report saved to 'aave_combined_analysis.json'")
             
             # Create a summary DataFrame for the report
             if 'monthly_metrics' in results and token_stats_data and 'tokens' in token_stats_data:
-                # Get the most recent month's data
-                monthly_df = pd.DataFrame(results['monthly_metrics'])
-                monthly_df['date'] = pd.to_datetime(monthly_df['date'].astype(str))
-                latest_month = monthly_df['date'].max()
-                latest_data = monthly_df[monthly_df['date'] == latest_month]
-                
-                # Get token market data
-                token_market_data = token_stats_data['tokens']
-                
-                # Create combined data
-                combined_data = []
-                for _, row in latest_data.iterrows():
-                    token = row['token']
-                    market_data = token_market_data.get(token, {})
-                    
-                    combined_data.append({
-                        'Token': token,
-                        'Borrow Volume': row['Borrow_volume'],
-                        'Monthly Revenue': row['revenue'],
-                        'Market Cap': market_data.get('market_cap', 0),
-                        'Price (USD)': market_data.get('price_usd', 0),
-                        '24h Change (%)': market_data.get('percent_change_24h', 0),
-                        'Revenue to Market Cap Ratio': row['revenue'] / market_data.get('market_cap', 1) * 100 if market_data.get('market_cap', 0) > 0 else 0
-                    })
+                # Get the most recent month's data via the datetime column
+                # carried from process_revenue_data (no string reparse)
+                monthly_df = results['monthly_metrics']
+                latest_month = monthly_df['_date_dt'].max()
+                latest_data = monthly_df[monthly_df['_date_dt'] == latest_month]
                 
+                # Build a market-data frame once and merge, instead of an
+                # iterrows loop with per-row dict lookups
+                market_df = (
+                    pd.DataFrame.from_dict(token_stats_data['tokens'], orient='index')
+                    .reindex(columns=['market_cap', 'price_usd', 'percent_change_24h'])
+                    .rename_axis('token')
+                    .reset_index()
+                )
+
+                combined_df = latest_data.merge(market_df, on='token', how='left').fillna(
+                    {'market_cap': 0, 'price_usd': 0, 'percent_change_24h': 0}
+                )
+                ratio = np.where(
+                    combined_df['market_cap'] > 0,
+                    combined_df['revenue'] / combined_df['market_cap'] * 100,
+                    0.0
+                )
+
                 # Create and save DataFrame
-                combined_df = pd.DataFrame(combined_data)
+                combined_df = pd.DataFrame({
+                    'Token': combined_df['token'],
+                    'Borrow Volume': combined_df['Borrow_volume'],
+                    'Monthly Revenue': combined_df['revenue'],
+                    'Market Cap': combined_df['market_cap'],
+                    'Price (USD)': combined_df['price_usd'],
+                    '24h Change (%)': combined_df['percent_change_24h'],
+                    'Revenue to Market Cap Ratio': ratio
+                })
                 combined_df.to_csv('aave_token_revenue_metrics.csv', index=False)
                 print("Token revenue metrics saved to 'aave_token_revenue_metrics.csv'")
+
+                if pyarrow is not None:
+                    combined_df.to_parquet('aave_token_revenue_metrics.parquet',
+                                           compression='zstd', index=False)
+                    print("Token revenue metrics saved to 'aave_token_revenue_metrics.parquet'")
                 
-                # Print top tokens by revenue to market cap ratio
+                # Print top tokens by revenue to market cap ratio; nlargest
+                # avoids a full sort just to take the head
                 print("\nTop Tokens by Revenue to Market Cap Ratio:")
-                sorted_data = sorted(combined_data, key=lambda x: x['Revenue to Market Cap Ratio'], reverse=True)
-                for i, data in enumerate(sorted_data[:5], 1):
-                    print(f"{i}. {data['Token']}: {data['Revenue to Market Cap Ratio']:.6f}% (Revenue: ${data['Monthly Revenue']:,.2f}, Market Cap: ${data['Market Cap']:,.2f})")
+                top_tokens = combined_df.nlargest(5, 'Revenue to Market Cap Ratio')
+                for i, (token, revenue, market_cap, token_ratio) in enumerate(
+                        zip(top_tokens['Token'], top_tokens['Monthly Revenue'],
+                            top_tokens['Market Cap'], top_tokens['Revenue to Market Cap Ratio']), 1):
+                    print(f"{i}. {token}: {token_ratio:.6f}% (Revenue: ${revenue:,.2f}, Market Cap: ${market_cap:,.2f})")
         
-        except Exception as e:
-            print(f"Error creating combined report: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error creating combined report")
 
 
 def main():
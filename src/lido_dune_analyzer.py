@@ -6,6 +6,7 @@ Uses the Execution Layer Rewards Vault query to track ETH inflows.
 """
 
 import os
+import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from dotenv import load_dotenv
@@ -13,10 +14,36 @@ from dune_client.client import DuneClient
 from dune_client.types import QueryParameter
 import pandas as pd
 import requests
+import _dune_cache
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
 
 # Load environment variables
 load_dotenv()
 
+# Short-lived ETH price cache shared across the period analyses
+_ETH_PRICE_CACHE = {"price": None, "ts": 0.0}
+
+
+def _get_eth_price_cached(ttl: int = 60) -> float:
+    """Get current ETH price in USD from CoinGecko, cached for ttl seconds."""
+    if _ETH_PRICE_CACHE["price"] is not None and time.time() - _ETH_PRICE_CACHE["ts"] < ttl:
+        return _ETH_PRICE_CACHE["price"]
+
+    try:
+        response = requests.get("https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd")
+        price = float(response.json()["ethereum"]["usd"])
+    except:
+        return 1900  # Fallback price if API fails
+
+    _ETH_PRICE_CACHE["price"] = price
+    _ETH_PRICE_CACHE["ts"] = time.time()
+    return price
+
+
 class LidoDuneAnalyzer:
     # Dune Analytics Query IDs for Lido revenue tracking
     REVENUE_QUERY = """
@@ -107,13 +134,15 @@ class LidoDuneAnalyzer:
         
         self.client = DuneClient(self.api_key)
         
-    def get_revenue_data(self, days: int = 30) -> Dict:
+    def get_revenue_data(self, days: int = 30, eth_price: Optional[float] = None) -> Dict:
         """
         Get Lido revenue data from Dune Analytics.
-        
+
         Args:
             days: Number of days to analyze (default: 30)
-            
+            eth_price: Current ETH price in USD; fetched (with a short
+                TTL cache) when not provided
+
         Returns:
             Dictionary containing revenue data
         """
@@ -123,23 +152,41 @@ class LidoDuneAnalyzer:
             
             # Replace the days parameter in the query
             query = self.REVENUE_QUERY.replace(":days", str(days))
-            
-            # Execute the query
-            results = self.client.sql_query(
-                name="lido_revenue",
-                query=query,
-                description=f"Lido revenue analysis for last {days} days"
-            )
-            
-            if not results or not hasattr(results, 'result'):
-                print("No data returned from Dune Analytics")
+
+            def fetch():
+                # Execute the query
+                results = self.client.sql_query(
+                    name="lido_revenue",
+                    query=query,
+                    description=f"Lido revenue analysis for last {days} days"
+                )
+
+                if not results or not hasattr(results, 'result'):
+                    print("No data returned from Dune Analytics")
+                    return None
+
+                # The Arrow path builds the columns against the schema fixed
+                # by the SQL and hands them to pandas zero-copy
+                rows = results.result.rows
+                if pyarrow is not None and rows:
+                    schema = pyarrow.schema([
+                        ('day', pyarrow.string()),
+                        ('eth_received', pyarrow.float64()),
+                        ('eth_received_cumul', pyarrow.float64())
+                    ])
+                    table = pyarrow.Table.from_pylist(rows, schema=schema)
+                    return table.to_pandas(self_destruct=True)
+                return pd.DataFrame(rows)
+
+            # Intraday periods get a short TTL, daily series a 24h one
+            ttl = 3600 if days <= 1 else 86400
+            df = _dune_cache.cached_query(("lido_revenue", days, query), ttl=ttl, fetch_fn=fetch)
+
+            if df is None:
                 return {
                     "success": False,
                     "error": "No data returned"
                 }
-            
-            # Convert result to DataFrame
-            df = pd.DataFrame(results.result.rows)
             if df.empty:
                 return {
                     "success": False,
@@ -154,13 +201,10 @@ class LidoDuneAnalyzer:
             latest_cumulative = float(df['cumulative_eth'].iloc[0])
             daily_avg = total_eth / min(days, len(df))
             
-            # Get current ETH price from CoinGecko
-            try:
-                response = requests.get("https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd")
-                eth_price = float(response.json()["ethereum"]["usd"])
-            except:
-                eth_price = 1900  # Fallback price if API fails
-            
+            # Get current ETH price (cached) unless the caller supplied one
+            if eth_price is None:
+                eth_price = _get_eth_price_cached()
+
             return {
                 "success": True,
                 "period_days": days,
@@ -182,21 +226,77 @@ class LidoDuneAnalyzer:
             }
     
     def analyze_revenue_periods(self) -> Dict:
-        """Analyze revenue for different time periods (24h, 7d, 30d, 1y)."""
+        """
+        Analyze revenue for different time periods (24h, 7d, 30d, 1y).
+
+        The year-long query is a strict superset of the shorter windows
+        (same daily granularity, same cumulative series), so Dune is
+        executed once for 365 days and the 24h/7d/30d metrics are derived
+        by slicing that result — one query execution instead of four.
+        """
         periods = {
             "24h": 1,
             "7d": 7,
             "30d": 30,
             "1y": 365
         }
-        
+
+        print("\nFetching the full 1y series once...")
+        full = self.get_revenue_data(365)
+        if not full.get("success"):
+            return {period_name: full for period_name in periods}
+
+        df_full = pd.DataFrame(full["raw_data"])
+        # Parse dates into a separate series used only for slicing, so
+        # the raw_data records keep the original date strings the
+        # per-period queries emitted
+        dates = pd.to_datetime(df_full['date'])
+        latest_day = dates.max()
+        eth_price = full["eth_price"]
+
         results = {}
         for period_name, days in periods.items():
             print(f"\nAnalyzing {period_name} period...")
-            results[period_name] = self.get_revenue_data(days)
-        
+            if days >= 365:
+                results[period_name] = full
+                continue
+            subset = df_full[dates >= latest_day - pd.Timedelta(days=days)]
+            results[period_name] = self._summarize(subset, days, eth_price)
+
         return results
 
+    def _summarize(self, df: pd.DataFrame, days: int, eth_price: float) -> Dict:
+        """Build the revenue metrics dict for a slice of the daily series."""
+        if df.empty:
+            return {
+                "success": False,
+                "error": "No data found for the specified period"
+            }
+
+        total_eth = float(df['daily_eth'].sum())
+        # The per-period SQL restarts its running sum at the window
+        # start, so recompute the cumulative from the slice (difference
+        # of the year-long running totals plus the oldest day's amount)
+        # instead of reporting the year-long figure. Rows are ordered
+        # day DESC: iloc[0] is the latest day, iloc[-1] the oldest.
+        latest_cumulative = float(df['cumulative_eth'].iloc[0]
+                                  - df['cumulative_eth'].iloc[-1]
+                                  + df['daily_eth'].iloc[-1])
+        daily_avg = total_eth / min(days, len(df))
+
+        return {
+            "success": True,
+            "period_days": days,
+            "total_revenue_eth": total_eth,
+            "total_revenue_usd": total_eth * eth_price,
+            "daily_average_eth": daily_avg,
+            "daily_average_usd": daily_avg * eth_price,
+            "cumulative_eth": latest_cumulative,
+            "cumulative_usd": latest_cumulative * eth_price,
+            "eth_price": eth_price,
+            "raw_data": df.to_dict('records')
+        }
+
 def main():
     """Main function to demonstrate usage."""
     analyzer = LidoDuneAnalyzer()
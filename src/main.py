@@ -10,12 +10,9 @@ This module orchestrates the entire process:
 import os
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from data_collector import DataCollector
-from blockchair_collector import BlockchairCollector
-from solscan_collector import SolscanCollector
-from visualizer import Visualizer
 
 # Load environment variables
 load_dotenv()
@@ -46,39 +43,56 @@ def main():
     print(f"Start Date: {args.start_date}")
     print(f"End Date: {args.end_date}")
     
-    # Data collection
+    # Data collection. The collector modules pull pandas (and friends)
+    # transitively, so they are imported only when actually collecting —
+    # --skip-collection runs start about half a second sooner.
     if not args.skip_collection:
+        from data_collector import DataCollector
+        from blockchair_collector import BlockchairCollector
+        from solscan_collector import SolscanCollector
+
         print("\n=== Collecting Data ===")
-        
-        # Collect general protocol data
-        print("\n--- Collecting General Protocol Data ---")
+
+        # Each collector hits different APIs, so the stages are
+        # independent network I/O — run them concurrently and the total
+        # time is roughly the slowest stage instead of the sum
         data_collector = DataCollector()
-        protocol_data = data_collector.collect_all_data()
-        
-        if not args.solana_only:
-            # Collect blockchain data using Blockchair
-            print("\n--- Collecting Blockchain Data (Blockchair) ---")
-            blockchair_collector = BlockchairCollector()
-            blockchain_data = blockchair_collector.collect_all_protocols_data(args.start_date, args.end_date)
-        
-        # Collect Solana data using Solscan
-        print("\n--- Collecting Solana Data (Solscan) ---")
         solscan_collector = SolscanCollector()
-        
+
         # Jupiter accounts (example)
         jupiter_accounts = ["JUP4Fb2cqiRUcaTHdrPC8h2gNsA2ETXiPDD33WcGuJB"]
-        jupiter_data = solscan_collector.collect_protocol_revenue_data("Jupiter", jupiter_accounts)
-        
         # Fluid accounts (example)
         fluid_accounts = ["FLUIDRdWNMiTJmJuXyiFLpb5p9NVPQcC5U9FJUNTmRQ"]
-        fluid_data = solscan_collector.collect_protocol_revenue_data("Fluid", fluid_accounts)
-        
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            protocol_future = executor.submit(data_collector.collect_all_data)
+
+            blockchain_future = None
+            if not args.solana_only:
+                blockchair_collector = BlockchairCollector()
+                blockchain_future = executor.submit(
+                    blockchair_collector.collect_all_protocols_data,
+                    args.start_date, args.end_date)
+
+            jupiter_future = executor.submit(
+                solscan_collector.collect_protocol_revenue_data, "Jupiter", jupiter_accounts)
+            fluid_future = executor.submit(
+                solscan_collector.collect_protocol_revenue_data, "Fluid", fluid_accounts)
+
+            protocol_data = protocol_future.result()
+            if blockchain_future is not None:
+                blockchain_data = blockchain_future.result()
+            jupiter_data = jupiter_future.result()
+            fluid_data = fluid_future.result()
+
         print("\nData collection complete!")
     else:
         print("\nSkipping data collection, using existing data.")
     
     # Visualization
     if not args.skip_visualization:
+        from visualizer import Visualizer
+
         print("\n=== Creating Visualizations ===")
         visualizer = Visualizer()
         visualizer.create_all_visualizations()
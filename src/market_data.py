@@ -2,20 +2,122 @@
 Module for fetching cryptocurrency market data from CoinMarketCap.
 """
 import os
+import hashlib
 import requests
 import json
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 # Load environment variables
 load_dotenv()
 
+# On-disk TTL cache for CMC responses. Metadata (name, category, logo,
+# urls, ...) is essentially immutable over hours so it gets a long TTL;
+# quotes move constantly and get a short one.
+_CMC_CACHE_DIR = os.path.join(".cache", "cmc")
+METADATA_TTL = 3600
+QUOTES_TTL = 300
+
+_CACHE_STATS = {"hits": 0, "misses": 0}
+
+# Statuses worth retrying with backoff on either HTTP client
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _cached_fetch(kind: str, symbols: List[str], ttl: int, fetch_fn) -> Dict:
+    """Serve a CMC response from the disk cache when fresh, else fetch."""
+    digest = hashlib.blake2b(f"{kind}:{','.join(sorted(symbols))}".encode(),
+                             digest_size=16).hexdigest()
+    path = os.path.join(_CMC_CACHE_DIR, f"{digest}.json")
+
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if time.time() - entry.get("fetched_at", 0) < ttl:
+                _CACHE_STATS["hits"] += 1
+                return entry["payload"]
+        except Exception as e:
+            print(f"Ignoring unreadable CMC cache entry {digest}: {e}")
+
+    _CACHE_STATS["misses"] += 1
+    payload = fetch_fn()
+
+    os.makedirs(_CMC_CACHE_DIR, exist_ok=True)
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump({"fetched_at": time.time(), "payload": payload}, f)
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        print(f"Failed to write CMC cache entry {digest}: {e}")
+
+    print(f"CMC cache: {_CACHE_STATS['hits']} hits, {_CACHE_STATS['misses']} misses")
+    return payload
+
+def _dig(d, path, default=None):
+    """Walk a nested dict/list along path, returning default on any miss."""
+    for key in path:
+        if isinstance(key, int):
+            d = d[key] if isinstance(d, list) and len(d) > key else None
+        elif isinstance(d, dict):
+            d = d.get(key)
+        else:
+            d = None
+        if d is None:
+            return default
+    return d
+
+
+# Output field -> (source response, path, default) for get_token_stats.
+# Driving the extraction from one table replaces ~20 chained .get calls
+# (and their throwaway default allocations) per symbol with a single
+# loop over a precompiled spec.
+_FIELD_SPEC = [
+    ('id', 'meta', ('id',), None),
+    ('name', 'meta', ('name',), None),
+    ('token_type', 'meta', ('category',), None),
+    ('description', 'meta', ('description',), None),
+    ('logo', 'meta', ('logo',), None),
+    ('website', 'meta', ('urls', 'website', 0), None),
+    ('explorer', 'meta', ('urls', 'explorer', 0), None),
+    ('twitter', 'meta', ('urls', 'twitter', 0), None),
+    ('reddit', 'meta', ('urls', 'reddit', 0), None),
+    ('tags', 'meta', ('tags',), []),
+    ('platform', 'meta', ('platform',), None),
+    ('date_added', 'meta', ('date_added',), None),
+    ('price_usd', 'quote', ('quote', 'USD', 'price'), None),
+    ('market_cap', 'quote', ('quote', 'USD', 'market_cap'), None),
+    ('volume_24h', 'quote', ('quote', 'USD', 'volume_24h'), None),
+    ('percent_change_24h', 'quote', ('quote', 'USD', 'percent_change_24h'), None),
+    ('percent_change_7d', 'quote', ('quote', 'USD', 'percent_change_7d'), None),
+    ('circulating_supply', 'quote', ('circulating_supply',), None),
+    ('total_supply', 'quote', ('total_supply',), None),
+    ('max_supply', 'quote', ('max_supply',), None),
+    ('last_updated', 'quote', ('quote', 'USD', 'last_updated'), None),
+]
+
+
 class MarketDataAPI:
     """
     Client for fetching cryptocurrency market data.
     """
     BASE_URL = "https://pro-api.coinmarketcap.com/v1"
-    
+
     def __init__(self):
         """
         Initialize the market data API client.
@@ -23,12 +125,73 @@ class MarketDataAPI:
         self.api_key = os.getenv("COINMARKETCAP_API")
         if not self.api_key:
             raise ValueError("CoinMarketCap API key not found. Please set COINMARKETCAP_API in .env file")
-        
+
         self.headers = {
             'X-CMC_PRO_API_KEY': self.api_key,
             'Accept': 'application/json'
         }
-    
+
+        # One pooled session for all CMC calls so the TLS handshake is
+        # paid once instead of once per request. With httpx installed the
+        # client speaks HTTP/2, multiplexing concurrent requests over a
+        # single connection; otherwise a requests session with urllib3
+        # retries (429/5xx, exponential backoff) is used. Both expose the
+        # same .get(url, params=...)/.close() surface.
+        if httpx is not None:
+            self.session = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                transport=httpx.HTTPTransport(retries=3),
+                headers=self.headers,
+            )
+        else:
+            self.session = requests.Session()
+            self.session.headers.update(self.headers)
+            retries = Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=_RETRY_STATUSES,
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+            )
+            self.session.mount('https://', HTTPAdapter(
+                pool_connections=10, pool_maxsize=20, max_retries=retries))
+
+    def _get(self, url, params=None):
+        """
+        GET with 429/5xx retries on either client.
+
+        The requests session already retries these statuses through
+        urllib3; httpx's HTTPTransport(retries=...) only retries
+        connection errors, so on that path the same policy (exponential
+        backoff, Retry-After honored) is applied here.
+        """
+        if httpx is None or not isinstance(self.session, httpx.Client):
+            return self.session.get(url, params=params)
+
+        response = self.session.get(url, params=params)
+        for attempt in range(5):
+            if response.status_code not in _RETRY_STATUSES:
+                return response
+            try:
+                delay = float(response.headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                delay = 0.5 * (2 ** attempt)
+            print(f"CMC returned {response.status_code}, retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            response = self.session.get(url, params=params)
+        return response
+
+    def close(self):
+        """Close the underlying HTTP session."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def get_token_metadata(self, symbols: List[str]) -> Dict:
         """
         Get metadata for specified tokens.
@@ -43,10 +206,13 @@ class MarketDataAPI:
         params = {
             'symbol': ','.join(symbols)
         }
-        
-        response = requests.get(endpoint, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
+
+        def fetch():
+            response = self._get(endpoint, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        return _cached_fetch("metadata", symbols, METADATA_TTL, fetch)
     
     def get_token_quotes(self, symbols: List[str]) -> Dict:
         """
@@ -63,10 +229,13 @@ class MarketDataAPI:
             'symbol': ','.join(symbols),
             'convert': 'USD'
         }
-        
-        response = requests.get(endpoint, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
+
+        def fetch():
+            response = self._get(endpoint, params=params)
+            response.raise_for_status()
+            return response.json()
+
+        return _cached_fetch("quotes", symbols, QUOTES_TTL, fetch)
     
     def get_token_stats(self, symbols: List[str]) -> Dict[str, Dict]:
         """
@@ -79,44 +248,27 @@ class MarketDataAPI:
             Dictionary with token symbols as keys and their stats as values
         """
         try:
-            # Get metadata (includes token type, category, etc.)
-            metadata = self.get_token_metadata(symbols)
+            # Metadata and quotes are independent endpoints; fetch both
+            # concurrently on the shared session (thread-safe for GETs)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                metadata_future = executor.submit(self.get_token_metadata, symbols)
+                quotes_future = executor.submit(self.get_token_quotes, symbols)
+                metadata = metadata_future.result()
+                quotes = quotes_future.result()
             
-            # Get quotes (includes price, market cap, volume, etc.)
-            quotes = self.get_token_quotes(symbols)
-            
-            # Combine the data
+            # Combine the data by walking the precompiled field spec
             result = {}
+            metadata_by_symbol = metadata.get('data', {})
+            quotes_by_symbol = quotes.get('data', {})
             for symbol in symbols:
-                if symbol in metadata.get('data', {}) and symbol in quotes.get('data', {}):
-                    meta = metadata['data'][symbol]
-                    quote = quotes['data'][symbol]
-                    
-                    result[symbol] = {
-                        'id': meta.get('id'),
-                        'name': meta.get('name'),
-                        'symbol': symbol,
-                        'token_type': meta.get('category'),
-                        'description': meta.get('description'),
-                        'logo': meta.get('logo'),
-                        'website': meta.get('urls', {}).get('website', [None])[0],
-                        'explorer': meta.get('urls', {}).get('explorer', [None])[0],
-                        'twitter': meta.get('urls', {}).get('twitter', [None])[0],
-                        'reddit': meta.get('urls', {}).get('reddit', [None])[0],
-                        'tags': meta.get('tags', []),
-                        'platform': meta.get('platform'),
-                        'date_added': meta.get('date_added'),
-                        'price_usd': quote.get('quote', {}).get('USD', {}).get('price'),
-                        'market_cap': quote.get('quote', {}).get('USD', {}).get('market_cap'),
-                        'volume_24h': quote.get('quote', {}).get('USD', {}).get('volume_24h'),
-                        'percent_change_24h': quote.get('quote', {}).get('USD', {}).get('percent_change_24h'),
-                        'percent_change_7d': quote.get('quote', {}).get('USD', {}).get('percent_change_7d'),
-                        'circulating_supply': quote.get('circulating_supply'),
-                        'total_supply': quote.get('total_supply'),
-                        'max_supply': quote.get('max_supply'),
-                        'last_updated': quote.get('quote', {}).get('USD', {}).get('last_updated')
-                    }
-                
+                if symbol in metadata_by_symbol and symbol in quotes_by_symbol:
+                    sources = {'meta': metadata_by_symbol[symbol],
+                               'quote': quotes_by_symbol[symbol]}
+                    row = {key: _dig(sources[source], path, default)
+                           for key, source, path, default in _FIELD_SPEC}
+                    row['symbol'] = symbol
+                    result[symbol] = row
+
             return result
         
         except requests.exceptions.RequestException as e:
@@ -142,8 +294,8 @@ def analyze_protocol_tokens(protocol_name: str, token_symbols: List[str]) -> Dic
         Dictionary containing token stats for the protocol
     """
     try:
-        api = MarketDataAPI()
-        token_stats = api.get_token_stats(token_symbols)
+        with MarketDataAPI() as api:
+            token_stats = api.get_token_stats(token_symbols)
         
         # Calculate aggregate metrics
         total_market_cap = sum(token.get('market_cap', 0) or 0 for token in token_stats.values())
@@ -155,13 +307,20 @@ def analyze_protocol_tokens(protocol_name: str, token_symbols: List[str]) -> Dic
             'token_count': len(token_stats),
             'total_market_cap': total_market_cap,
             'avg_24h_change': avg_24h_change,
-            'timestamp': requests.get('http://worldtimeapi.org/api/timezone/Etc/UTC').json().get('datetime')
+            'timestamp': datetime.now(timezone.utc).isoformat()
         }
         
-        # Save to file
+        # Save to file (write temp, then rename, so readers never see a
+        # partially written dump)
         output_file = f"{protocol_name.lower()}_token_stats.json"
-        with open(output_file, 'w') as f:
-            json.dump(result, f, indent=2)
+        tmp_file = output_file + ".tmp"
+        if orjson is not None:
+            with open(tmp_file, 'wb') as f:
+                f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            with open(tmp_file, 'w') as f:
+                json.dump(result, f, indent=2)
+        os.replace(tmp_file, output_file)
         print(f"Token statistics saved to '{output_file}'")
         
         return result
@@ -1,101 +1,196 @@
 """
 Updated token statistics module for specified tokens
 """
+import os
 import requests
 import json
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # API key directly in the code
 API_KEY = "83c478ff-b19b-4ee5-8e9e-1b7bfcfc2436"
 
-def fetch_token_data(symbol: str):
+# Shared pooled session so repeated CMC calls reuse one TLS connection;
+# transient 429/5xx responses are retried with exponential backoff
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'X-CMC_PRO_API_KEY': API_KEY,
+    'Accept': 'application/json'
+})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )))
+
+# Symbol -> CMC id mapping cache. IDs are stable, so one /map call is
+# amortized over a month of runs; querying by id also skips the
+# server-side symbol lookup and avoids ambiguous-symbol payloads.
+_ID_CACHE_FILE = 'specified_token_ids.json'
+_ID_CACHE_TTL = 30 * 86400
+
+
+def _resolve_token_ids(symbols: List[str]) -> Dict[str, int]:
+    """
+    Resolve token symbols to CoinMarketCap ids via /cryptocurrency/map,
+    cached on disk for 30 days. Returns an empty dict on failure so
+    callers can fall back to symbol-based queries.
+    """
+    try:
+        with open(_ID_CACHE_FILE) as f:
+            cached = json.load(f)
+        if (time.time() - cached.get('fetched_at', 0) < _ID_CACHE_TTL
+                and all(symbol in cached.get('ids', {}) for symbol in symbols)):
+            return cached['ids']
+    except Exception:
+        pass
+
+    try:
+        response = _SESSION.get(
+            "https://pro-api.coinmarketcap.com/v1/cryptocurrency/map",
+            params={'symbol': ','.join(symbols), 'sort': 'cmc_rank'})
+        response.raise_for_status()
+        entries = response.json().get('data', [])
+    except Exception as e:
+        print(f"Could not resolve CMC ids, falling back to symbols: {e}")
+        return {}
+
+    # /map can return several listings per symbol (including defunct
+    # tokens); with sort=cmc_rank the first entry per symbol is the
+    # highest-ranked listing, so keep that one
+    ids = {}
+    for entry in entries:
+        ids.setdefault(entry['symbol'], entry['id'])
+
+    try:
+        with open(_ID_CACHE_FILE + '.tmp', 'w') as f:
+            json.dump({'fetched_at': time.time(), 'ids': ids}, f, indent=2)
+        os.replace(_ID_CACHE_FILE + '.tmp', _ID_CACHE_FILE)
+    except Exception as e:
+        print(f"Failed to cache CMC id mapping: {e}")
+
+    return ids
+
+
+def fetch_token_data(symbols: List[str]) -> Dict[str, Dict]:
     """
-    Fetch token data from CoinMarketCap API for a single token.
-    
+    Fetch token data from CoinMarketCap API for a batch of tokens.
+
+    Both CMC endpoints accept a comma-separated symbol list, so the whole
+    batch costs two HTTP requests instead of two per token.
+
     Args:
-        symbol: Token symbol to fetch data for
-    
+        symbols: Token symbols to fetch data for
+
     Returns:
-        Dictionary with token data
+        Dictionary mapping each symbol with data to its token data
     """
-    print(f"Fetching data for token: {symbol}")
-    
-    headers = {
-        'X-CMC_PRO_API_KEY': API_KEY,
-        'Accept': 'application/json'
-    }
-    
+    print(f"Fetching data for tokens: {', '.join(symbols)}")
+
+    # Prefer id-based queries (resolved once and cached); fall back to
+    # symbols when the mapping is unavailable
+    ids = _resolve_token_ids(symbols)
+    if ids:
+        resolved = {symbol: str(ids[symbol]) for symbol in symbols if symbol in ids}
+        batch_params = {'id': ','.join(resolved.values())}
+    else:
+        resolved = {symbol: symbol for symbol in symbols}
+        batch_params = {'symbol': ','.join(symbols)}
+
     # Get metadata
     metadata_url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/info"
-    metadata_params = {'symbol': symbol}
-    
+    metadata_params = dict(batch_params)
+
     # Get quotes
     quotes_url = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
-    quotes_params = {'symbol': symbol, 'convert': 'USD'}
-    
+    quotes_params = dict(batch_params, convert='USD')
+
     try:
-        # Fetch metadata
-        metadata_response = requests.get(metadata_url, headers=headers, params=metadata_params)
+        # Metadata and quotes are independent requests, so overlap their
+        # network waits on two threads sharing the pooled session
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            metadata_future = executor.submit(_SESSION.get, metadata_url, params=metadata_params)
+            quotes_future = executor.submit(_SESSION.get, quotes_url, params=quotes_params)
+            metadata_response = metadata_future.result()
+            quotes_response = quotes_future.result()
+
         metadata_response.raise_for_status()
         metadata = metadata_response.json()
-        
-        # Fetch quotes
-        quotes_response = requests.get(quotes_url, headers=headers, params=quotes_params)
+
         quotes_response.raise_for_status()
         quotes = quotes_response.json()
-        
-        # Process and combine data
-        if symbol in metadata.get('data', {}) and symbol in quotes.get('data', {}):
-            meta = metadata['data'][symbol]
-            quote = quotes['data'][symbol]
-            
-            return {
-                'name': meta.get('name', ''),
-                'symbol': symbol,
-                'category': meta.get('category', ''),
-                'price_usd': quote.get('quote', {}).get('USD', {}).get('price'),
-                'market_cap': quote.get('quote', {}).get('USD', {}).get('market_cap'),
-                'volume_24h': quote.get('quote', {}).get('USD', {}).get('volume_24h'),
-                'percent_change_24h': quote.get('quote', {}).get('USD', {}).get('percent_change_24h'),
-                'percent_change_7d': quote.get('quote', {}).get('USD', {}).get('percent_change_7d'),
-                'circulating_supply': quote.get('circulating_supply')
-            }
-        else:
-            print(f"No data found for token: {symbol}")
-            return None
-    
+
+        # Process and combine data (responses are keyed by whichever
+        # identifier was queried: id or symbol)
+        token_data = {}
+        for symbol in symbols:
+            key = resolved.get(symbol)
+            if key is not None and key in metadata.get('data', {}) and key in quotes.get('data', {}):
+                meta = metadata['data'][key]
+                quote = quotes['data'][key]
+
+                token_data[symbol] = {
+                    'name': meta.get('name', ''),
+                    'symbol': symbol,
+                    'category': meta.get('category', ''),
+                    'price_usd': quote.get('quote', {}).get('USD', {}).get('price'),
+                    'market_cap': quote.get('quote', {}).get('USD', {}).get('market_cap'),
+                    'volume_24h': quote.get('quote', {}).get('USD', {}).get('volume_24h'),
+                    'percent_change_24h': quote.get('quote', {}).get('USD', {}).get('percent_change_24h'),
+                    'percent_change_7d': quote.get('quote', {}).get('USD', {}).get('percent_change_7d'),
+                    'circulating_supply': quote.get('circulating_supply')
+                }
+            else:
+                print(f"No data found for token: {symbol}")
+
+        return token_data
+
     except requests.exceptions.RequestException as e:
         print(f"API request error: {e}")
         if hasattr(e, 'response') and e.response:
             print(f"Response: {e.response.text}")
-        return None
-    
+        return {}
+
     except Exception as e:
         print(f"Unexpected error: {e}")
         import traceback
         traceback.print_exc()
-        return None
+        return {}
 
 
 def analyze_specified_tokens():
     """
     Analyze specified tokens and fetch their market data.
-    
+
     Tokens: AAVE, LDO, JUP, COMP, FLUID, S, ETH, SOL, SUI, MKR, SKY
     """
     tokens = ["AAVE", "LDO", "JUP", "COMP", "FLUID", "S", "ETH", "SOL", "SUI", "MKR", "SKY"]
-    token_data = {}
-    
-    for token in tokens:
-        data = fetch_token_data(token)
-        if data:
-            token_data[token] = data
-    
-    # Save all collected data to JSON
+    token_data = fetch_token_data(tokens)
+
+    # Save all collected data to JSON (write temp, then rename, so
+    # readers never see a partially written dump)
     if token_data:
-        with open('specified_token_stats.json', 'w') as f:
-            json.dump(token_data, f, indent=2)
+        if orjson is not None:
+            with open('specified_token_stats.json.tmp', 'wb') as f:
+                f.write(orjson.dumps(token_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open('specified_token_stats.json.tmp', 'w') as f:
+                json.dump(token_data, f, indent=2)
+        os.replace('specified_token_stats.json.tmp', 'specified_token_stats.json')
         print("Token statistics saved to 'specified_token_stats.json'")
     else:
         print("No token data available")